@@ -1,11 +1,13 @@
 import os
-import json
+import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import uuid
 
+import orjson
 from langchain_core.messages import BaseMessage
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
 
 from schemas import SessionState
 from retrieval import SimulatedRetriever
@@ -14,6 +16,13 @@ from agent import create_workflow, AgentState
 from prompts import MEMORY_SUMMARY_PROMPT
 
 
+def _json_default(obj):
+    """Serialize the pydantic objects (messages, intents) held in session state."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 class DocumentAssistant:
     """
     The assistant creates and loads sessions and
@@ -25,7 +34,9 @@ class DocumentAssistant:
             openai_api_key: str,
             model_name: str = "gpt-4o",
             temperature: float = 0.1,
-            session_storage_path: str = "./sessions"
+            session_storage_path: str = "./sessions",
+            enable_response_cache: bool = False,
+            checkpointer=None
     ):
         # Initialize LLM
         self.llm = ChatOpenAI(
@@ -41,7 +52,10 @@ class DocumentAssistant:
         self.tools = get_all_tools(self.retriever, self.tool_logger)
 
         # Create workflow (compiled with checkpointer inside create_workflow)
-        self.workflow = create_workflow(self.llm, self.tools)
+        self.workflow = create_workflow(self.llm, self.tools, checkpointer=checkpointer)
+
+        # Replay answers for identical repeat turns (see agent.cache_response)
+        self.enable_response_cache = enable_response_cache
 
         # Session management
         self.session_storage_path = session_storage_path
@@ -50,6 +64,10 @@ class DocumentAssistant:
         # Current session
         self.current_session: Optional[SessionState] = None
 
+        # One loop for the assistant's lifetime: the LLM's async HTTP pool is bound
+        # to the loop it first ran on, so a fresh asyncio.run() per turn breaks it
+        self._loop = asyncio.new_event_loop()
+
     def start_session(self, user_id: str, session_id: Optional[str] = None) -> str:
         """Start a new session or resume an existing one."""
         if session_id and self._session_exists(session_id):
@@ -74,8 +92,8 @@ class DocumentAssistant:
 
     def _load_session(self, session_id: str) -> SessionState:
         filepath = os.path.join(self.session_storage_path, f"{session_id}.json")
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            data = orjson.loads(f.read())
         return SessionState(**data)
 
     def _save_session(self) -> None:
@@ -86,28 +104,25 @@ class DocumentAssistant:
             )
             session_dict = self.current_session.dict()
 
-            def serialize_datetime(obj):
-                if isinstance(obj, datetime):
-                    return obj.isoformat()
-                return obj
-
-            with open(filepath, 'w') as f:
-                json.dump(session_dict, f, indent=2, default=serialize_datetime)
+            # orjson encodes datetimes natively and is much faster than json
+            # for the growing conversation history written after every turn
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(session_dict, option=orjson.OPT_INDENT_2, default=_json_default))
 
-    def _get_conversation_summary(self, config) -> str:
+    async def _get_conversation_summary(self, config) -> str:
         if not self.current_session or not self.current_session.conversation_history:
             return "No previous conversation."
 
-        current_state = self.workflow.get_state(config).values
+        current_state = (await self.workflow.aget_state(config)).values
 
         summary = current_state.get("conversation_summary", [])
         return summary
 
-    def _get_conversation_history(self, config) -> List[BaseMessage]:
+    async def _get_conversation_history(self, config) -> List[BaseMessage]:
         if not self.current_session or not self.current_session.conversation_history:
             return []
 
-        current_state = self.workflow.get_state(config).values
+        current_state = (await self.workflow.aget_state(config)).values
 
         history = current_state.get("messages", [])
         return history
@@ -115,6 +130,10 @@ class DocumentAssistant:
 
     def process_message(self, user_input: str) -> Dict[str, Any]:
         """Process a user message using the LangGraph workflow."""
+        return self._loop.run_until_complete(self.aprocess_message(user_input))
+
+    async def aprocess_message(self, user_input: str) -> Dict[str, Any]:
+        """Async variant of process_message; the workflow nodes are coroutines."""
 
         if not self.current_session:
             raise ValueError("No active session. Call start_session() first.")
@@ -124,7 +143,8 @@ class DocumentAssistant:
             "configurable": {
                 "thread_id": self.current_session.session_id,
                 "llm": self.llm,
-                "tools": self.tools
+                "tools": self.tools,
+                "enable_response_cache": self.enable_response_cache
             }
         }
 
@@ -133,7 +153,7 @@ class DocumentAssistant:
             "user_input": user_input,
             "intent": None,
             "next_step": "classify_intent",
-            "conversation_summary": self._get_conversation_summary(config),
+            "conversation_summary": await self._get_conversation_summary(config),
             "active_documents": self.current_session.document_context,
             "current_response": None,
             "tools_used": [],
@@ -144,7 +164,7 @@ class DocumentAssistant:
         }
         try:
             # Invoke the workflow with a thread_id equal to the session_id
-            final_state = self.workflow.invoke(initial_state, config=config)
+            final_state = await self.workflow.ainvoke(initial_state, config=config)
             # Update session with new state
             if final_state.get("messages"):
 
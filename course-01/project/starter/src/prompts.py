@@ -1,10 +1,15 @@
+import os
+from functools import lru_cache
+
+from langchain_core.messages import SystemMessage
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.prompts.chat import SystemMessagePromptTemplate, HumanMessagePromptTemplate
 
 
+@lru_cache(maxsize=None)
 def get_intent_classification_prompt() -> PromptTemplate:
     """
-    Get the intent classification prompt template.
+    Get the intent classification prompt template (built once and reused).
     """
     return PromptTemplate(
         input_variables=["user_input", "conversation_history"],
@@ -42,6 +47,8 @@ Guidelines:
 4. Be precise with numbers and dates
 5. Maintain professional tone
 
+Alongside your answer, fill in conversation_summary with a concise summary of the conversation so far, including this turn, and active_document_ids with the IDs of the documents relevant to the user's last message.
+
 """
 
 # Summarization System Prompt
@@ -58,6 +65,8 @@ Guidelines:
 2. Structure summaries with clear sections
 3. Include document IDs in your summary
 4. Focus on actionable information
+
+Alongside your answer, fill in conversation_summary with a concise summary of the conversation so far, including this turn, and active_document_ids with the IDs of the documents relevant to the user's last message.
 """
 
 # Calculation System Prompt
@@ -85,13 +94,45 @@ Examples of operations you can help with:
 - Percentage calculations
 - Differences between values
 - Complex multi-step calculations
+
+Alongside your answer, fill in conversation_summary with a concise summary of the conversation so far, including this turn, and active_document_ids with the IDs of the documents relevant to the user's last message.
 """
 
 
+def _cache_control_enabled() -> bool:
+    return os.getenv("PROMPT_CACHE_CONTROL", "0") == "1"
+
+
+def _build_system_message(system_prompt: str) -> SystemMessage:
+    if _cache_control_enabled():
+        return SystemMessage(content=[{
+            "type": "text",
+            "text": system_prompt,
+            "cache_control": {"type": "ephemeral"},
+        }])
+    return SystemMessage(content=system_prompt)
+
+
+def get_system_prompt_message(system_prompt: str):
+    """
+    Build the static system block that leads every chat prompt.
+
+    With PROMPT_CACHE_CONTROL=1 the block carries an ephemeral cache_control
+    marker so providers with explicit prompt caching (Anthropic, Bedrock) can
+    reuse the prefix across turns. Otherwise a plain system template is used,
+    which OpenAI caches automatically as long as the prefix stays unchanged.
+    """
+    if _cache_control_enabled():
+        return _build_system_message(system_prompt)
+    return SystemMessagePromptTemplate.from_template(system_prompt)
+
+
 # Task 3.1: Complete get_chat_prompt_template function
+@lru_cache(maxsize=None)
 def get_chat_prompt_template(intent_type: str) -> ChatPromptTemplate:
     """
     Get the appropriate chat prompt template based on intent.
+    Templates are immutable, so each one is built once and reused.
     """
     if intent_type == "qa":
         system_prompt = QA_SYSTEM_PROMPT
@@ -103,7 +144,7 @@ def get_chat_prompt_template(intent_type: str) -> ChatPromptTemplate:
         system_prompt = QA_SYSTEM_PROMPT  # Default fallback
 
     return ChatPromptTemplate.from_messages([
-        SystemMessagePromptTemplate.from_template(system_prompt),
+        get_system_prompt_message(system_prompt),
         MessagesPlaceholder("chat_history"),
         HumanMessagePromptTemplate.from_template("{input}")
     ])
@@ -118,3 +159,28 @@ Focus on:
 - Important findings or calculations
 - Any unresolved questions
 """
+
+
+SYSTEM_PROMPTS = {
+    "qa": QA_SYSTEM_PROMPT,
+    "summarization": SUMMARIZATION_SYSTEM_PROMPT,
+    "calculation": CALCULATION_SYSTEM_PROMPT,
+}
+
+
+@lru_cache(maxsize=None)
+def get_system_message(intent_type: str) -> SystemMessage:
+    """
+    Get the system message for an agent node, for callers that build the
+    message list directly instead of formatting a chat prompt template.
+    Unknown intents fall back to the Q&A prompt.
+    """
+    return _build_system_message(SYSTEM_PROMPTS.get(intent_type, QA_SYSTEM_PROMPT))
+
+
+@lru_cache(maxsize=None)
+def get_memory_system_message() -> SystemMessage:
+    """
+    Get the system message used to summarize conversation memory.
+    """
+    return _build_system_message(MEMORY_SUMMARY_PROMPT)
@@ -5,6 +5,10 @@ import re
 from schemas import DocumentChunk
 
 
+# Dollar amounts in natural language queries, e.g. "$50,000" or "1200.50"
+_AMOUNT_PATTERN = re.compile(r'\$?(\d+(?:,\d{3})*(?:\.\d{2})?)')
+
+
 @dataclass
 class Document:
     """Represents a document in our system"""
@@ -390,8 +394,7 @@ class SimulatedRetriever:
         query_lower = query.lower()
 
         # Extract amounts from query
-        amount_pattern = r'\$?(\d+(?:,\d{3})*(?:\.\d{2})?)'
-        amounts = [float(m.replace(',', '').replace('$', '')) for m in re.findall(amount_pattern, query)]
+        amounts = [float(m.replace(',', '').replace('$', '')) for m in _AMOUNT_PATTERN.findall(query)]
 
         # Check for comparison keywords
         if any(word in query_lower for word in ['over', 'above', 'more than', 'greater than', '>']):
@@ -20,6 +20,8 @@ class AnswerResponse(BaseModel):
     sources: List[str] = Field(default_factory=list, description="List of source document IDs used")
     confidence: float = Field(default=0.0, ge=0.0, le=1.0, description="Confidence score between 0 and 1")
     timestamp: datetime = Field(default_factory=datetime.now, description="When the response was generated")
+    conversation_summary: Optional[str] = Field(default=None, description="Summary of the conversation up to and including this turn")
+    active_document_ids: Optional[List[str]] = Field(default=None, description="IDs of the documents relevant to the user's last message")
 
 
 
@@ -30,6 +32,8 @@ class SummarizationResponse(BaseModel):
     key_points: List[str] = Field(description="List of key points extracted")
     document_ids: List[str] = Field(default_factory=lambda: list, description="Documents summarized")
     timestamp: datetime = Field(default_factory=datetime.now)
+    conversation_summary: Optional[str] = Field(default=None, description="Summary of the conversation up to and including this turn")
+    active_document_ids: Optional[List[str]] = Field(default=None, description="IDs of the documents relevant to the user's last message")
 
 
 class CalculationResponse(BaseModel):
@@ -39,6 +43,8 @@ class CalculationResponse(BaseModel):
     explanation: str = Field(description="Step-by-step explanation")
     units: Optional[str] = Field(default=None, description="Units if applicable")
     timestamp: datetime = Field(default_factory=datetime.now)
+    conversation_summary: Optional[str] = Field(default=None, description="Summary of the conversation up to and including this turn")
+    active_document_ids: Optional[List[str]] = Field(default=None, description="IDs of the documents relevant to the user's last message")
 
 
 class UpdateMemoryResponse(BaseModel):
@@ -11,6 +11,10 @@ import json
 from datetime import datetime
 
 
+# Calculator input may only contain digits, decimal points, basic operators, parentheses and spaces
+_ALLOWED_EXPRESSION_PATTERN = re.compile(r'^[\d\s\+\-\*\/\(\)\.\%]+$')
+
+
 class ToolLogger:
     """Logs tool usage with automatic persistence"""
 
@@ -86,9 +90,7 @@ def create_calculator_tool(logger: ToolLogger):
             cleaned_expression = expression.replace('$', '').replace(',', '').strip()
 
             # Validate the expression for safety - only allow basic math operations
-            # Allow: digits, decimal points, basic operators, parentheses, spaces
-            allowed_pattern = r'^[\d\s\+\-\*\/\(\)\.\%]+$'
-            if not re.match(allowed_pattern, cleaned_expression):
+            if not _ALLOWED_EXPRESSION_PATTERN.match(cleaned_expression):
                 error_msg = f"Invalid expression: '{expression}'. Only numbers and basic math operators (+, -, *, /, %, parentheses) are allowed."
                 logger.log_tool_use(
                     "calculator",
@@ -3,7 +3,7 @@ from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage
 from langgraph.prebuilt import create_react_agent
-from tools import TOOL_KIT
+from tools import TOOL_KIT, AGENT_TOOL_KIT
 
 load_dotenv()
 
@@ -24,7 +24,7 @@ class Agent:
             name="energy_advisor",
             prompt=SystemMessage(content=instructions),
             model=llm,
-            tools=TOOL_KIT,
+            tools=AGENT_TOOL_KIT,
         )
 
     def invoke(self, question: str, context:str=None) -> str:
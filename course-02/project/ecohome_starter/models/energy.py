@@ -3,7 +3,7 @@ Energy data models for EcoHome Energy Advisor
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, Float, DateTime, String, create_engine
+from sqlalchemy import Column, Integer, Float, DateTime, String, create_engine, select, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -92,28 +92,84 @@ class DatabaseManager:
         finally:
             session.close()
     
-    def get_usage_by_date_range(self, start_date: datetime, end_date: datetime):
-        """Get energy usage records within date range"""
+    def get_usage_by_date_range(self, start_date: datetime, end_date: datetime,
+                                device_type: str = None, limit: Optional[int] = None):
+        """Get energy usage records within date range, optionally for one device type and capped at limit records"""
         session = self.get_session()
         try:
-            return session.query(EnergyUsage).filter(
+            query = session.query(EnergyUsage).filter(
                 EnergyUsage.timestamp >= start_date,
                 EnergyUsage.timestamp <= end_date
-            ).order_by(EnergyUsage.timestamp).all()
+            )
+            if device_type:
+                query = query.filter(EnergyUsage.device_type == device_type)
+            return query.order_by(EnergyUsage.timestamp).limit(limit).all()
         finally:
             session.close()
     
-    def get_generation_by_date_range(self, start_date: datetime, end_date: datetime):
-        """Get solar generation records within date range"""
+    def get_generation_by_date_range(self, start_date: datetime, end_date: datetime, limit: Optional[int] = None):
+        """Get solar generation records within date range, optionally capped at limit records"""
         session = self.get_session()
         try:
             return session.query(SolarGeneration).filter(
                 SolarGeneration.timestamp >= start_date,
                 SolarGeneration.timestamp <= end_date
-            ).order_by(SolarGeneration.timestamp).all()
+            ).order_by(SolarGeneration.timestamp).limit(limit).all()
+        finally:
+            session.close()
+
+    def get_usage_totals(self, start_date: datetime, end_date: datetime, device_type: str = None):
+        """Get record count, total consumption and total cost within date range, aggregated in SQL"""
+        session = self.get_session()
+        try:
+            stmt = select(
+                func.count(),
+                func.coalesce(func.sum(EnergyUsage.consumption_kwh), 0.0),
+                func.coalesce(func.sum(func.coalesce(EnergyUsage.cost_usd, 0.0)), 0.0)
+            ).where(
+                EnergyUsage.timestamp >= start_date,
+                EnergyUsage.timestamp <= end_date
+            )
+            if device_type:
+                stmt = stmt.where(EnergyUsage.device_type == device_type)
+            return session.execute(stmt).one()
+        finally:
+            session.close()
+
+    def get_generation_totals(self, start_date: datetime, end_date: datetime):
+        """Get record count and total generation within date range, aggregated in SQL"""
+        session = self.get_session()
+        try:
+            return session.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(SolarGeneration.generation_kwh), 0.0)
+                ).where(
+                    SolarGeneration.timestamp >= start_date,
+                    SolarGeneration.timestamp <= end_date
+                )
+            ).one()
         finally:
             session.close()
     
+    def get_usage_by_device(self, start_date: datetime, end_date: datetime):
+        """Get per-device record count, consumption and cost within date range, grouped in SQL"""
+        session = self.get_session()
+        try:
+            return session.execute(
+                select(
+                    EnergyUsage.device_type,
+                    func.sum(EnergyUsage.consumption_kwh).label("consumption_kwh"),
+                    func.sum(func.coalesce(EnergyUsage.cost_usd, 0.0)).label("cost_usd"),
+                    func.count().label("records")
+                ).where(
+                    EnergyUsage.timestamp >= start_date,
+                    EnergyUsage.timestamp <= end_date
+                ).group_by(EnergyUsage.device_type)
+            ).all()
+        finally:
+            session.close()
+
     def get_recent_usage(self, hours: int = 24):
         """Get recent usage records"""
         from datetime import datetime, timedelta
@@ -3,10 +3,13 @@ Tools for EcoHome Energy Advisor Agent
 """
 import os
 import json
-import random
+import threading
+from functools import lru_cache, wraps
+import numpy as np
+import orjson
 from datetime import datetime, timedelta
-from typing import Dict, Any
-from langchain_core.tools import tool
+from typing import Dict, Any, List
+from langchain_core.tools import tool, StructuredTool
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import TextLoader
@@ -16,6 +19,34 @@ from models.energy import DatabaseManager
 # Initialize database manager
 db_manager = DatabaseManager()
 
+# Weather conditions with their solar irradiance ranges (W/m²) and likelihood,
+# stored as parallel arrays so a whole forecast grid can be sampled at once
+WEATHER_CONDITIONS = ("sunny", "partly_cloudy", "cloudy", "rainy")
+_CONDITION_WEIGHTS = np.array([0.4, 0.35, 0.2, 0.05])
+_IRRADIANCE_LOW = np.array([800.0, 400.0, 100.0, 50.0])
+_IRRADIANCE_HIGH = np.array([1000.0, 700.0, 350.0, 150.0])
+# Cumulative weights let conditions be sampled with a single searchsorted
+# instead of Generator.choice re-validating and re-summing p on every call
+_CONDITION_CUMWEIGHTS = np.cumsum(_CONDITION_WEIGHTS)
+
+_HOURS = np.arange(24)
+# Temperature peaks at 2 PM
+_TEMP_HOUR_FACTOR = 1 - np.abs(_HOURS - 14) / 14
+# Solar output peaks at noon and is zero outside daylight hours (6 AM to 8 PM)
+_SOLAR_HOUR_FACTOR = np.where(
+    (_HOURS >= 6) & (_HOURS <= 20),
+    np.clip(1 - np.abs(_HOURS - 13) / 7, 0, None),
+    0.0
+)
+
+# Time-of-use tariff lookup tables indexed by hour of day (typical California TOU rates):
+# off_peak 11 PM - 6 AM, partial_peak 6 AM - 4 PM and 9 PM - 11 PM, peak 4 PM - 9 PM
+_TOU_PERIOD_BY_HOUR = ("off_peak",) * 6 + ("partial_peak",) * 10 + ("peak",) * 5 + ("partial_peak",) * 2 + ("off_peak",)
+_TOU_RATES = {"off_peak": 0.10, "partial_peak": 0.15, "peak": 0.25}
+_TOU_RATE_BY_HOUR = np.array([_TOU_RATES[period] for period in _TOU_PERIOD_BY_HOUR])
+# Additional demand charge during peak hours
+_DEMAND_CHARGE_BY_HOUR = np.array([0.05 if period == "peak" else 0.0 for period in _TOU_PERIOD_BY_HOUR])
+
 # TODO: Implement get_weather_forecast tool
 @tool
 def get_weather_forecast(location: str, days: int = 3) -> Dict[str, Any]:
@@ -52,24 +83,19 @@ def get_weather_forecast(location: str, days: int = 3) -> Dict[str, Any]:
     """
     # Limit days to 1-7 range
     days = max(1, min(7, days))
+    rng = np.random.default_rng()
 
-    # Weather conditions with their solar irradiance ranges (W/m²)
-    weather_types = {
-        "sunny": {"irradiance_range": (800, 1000), "weight": 0.4},
-        "partly_cloudy": {"irradiance_range": (400, 700), "weight": 0.35},
-        "cloudy": {"irradiance_range": (100, 350), "weight": 0.2},
-        "rainy": {"irradiance_range": (50, 150), "weight": 0.05}
-    }
-
-    # Current weather conditions
-    current_condition = random.choices(
-        list(weather_types.keys()),
-        weights=[w["weight"] for w in weather_types.values()]
-    )[0]
+    # Draw the current condition and every daily condition in one go
+    condition_codes = np.searchsorted(
+        _CONDITION_CUMWEIGHTS,
+        rng.random(days + 1) * _CONDITION_CUMWEIGHTS[-1],
+        side="right"
+    )
+    current_condition = WEATHER_CONDITIONS[condition_codes[0]]
 
-    current_temp = random.uniform(15, 28)
-    current_humidity = random.randint(40, 80)
-    current_wind_speed = random.uniform(5, 25)
+    current_temp = rng.uniform(15, 28)
+    current_humidity = int(rng.integers(40, 81))
+    current_wind_speed = rng.uniform(5, 25)
 
     forecast = {
         "location": location,
@@ -84,60 +110,65 @@ def get_weather_forecast(location: str, days: int = 3) -> Dict[str, Any]:
         "daily": []
     }
 
-    # Generate hourly forecast for each day
-    for day in range(days):
-        day_condition = random.choices(
-            list(weather_types.keys()),
-            weights=[w["weight"] for w in weather_types.values()]
-        )[0]
-
-        daily_temps = []
-        daily_generation_potential = 0
-
-        for hour in range(24):
-            # Temperature varies throughout the day (cooler at night, warmer midday)
-            hour_factor = 1 - abs(hour - 14) / 14  # Peak at 2 PM
-            base_temp = 12 + random.uniform(-2, 2)  # Night base
-            temp_range = 15  # Day-night difference
-            temp = base_temp + (temp_range * hour_factor)
-            daily_temps.append(temp)
-
-            # Determine hourly condition (mostly consistent with daily condition)
-            if random.random() < 0.8:  # 80% chance to match daily condition
-                hourly_condition = day_condition
-            else:
-                hourly_condition = random.choice(list(weather_types.keys()))
-
-            # Solar irradiance - only during daylight hours (6 AM to 8 PM)
-            if 6 <= hour <= 20:
-                # Peak solar at noon
-                solar_factor = max(0, 1 - abs(hour - 13) / 7)
-                irr_range = weather_types[hourly_condition]["irradiance_range"]
-                base_irradiance = random.uniform(irr_range[0], irr_range[1])
-                solar_irradiance = round(base_irradiance * solar_factor, 1)
-                daily_generation_potential += solar_irradiance / 1000  # kWh estimate
-            else:
-                solar_irradiance = 0
-
-            forecast["hourly"].append({
-                "day": day,
-                "hour": hour,
-                "temperature_c": round(temp, 1),
-                "condition": hourly_condition,
-                "solar_irradiance": solar_irradiance,
-                "humidity": random.randint(35, 85),
-                "wind_speed": round(random.uniform(3, 20), 1)
-            })
+    # Generate the whole (days, 24) hourly grid at once
+    shape = (days, 24)
+    day_codes = condition_codes[1:]
+
+    # Temperature varies throughout the day (cooler at night, warmer midday)
+    temps = 12 + rng.uniform(-2, 2, shape) + 15 * _TEMP_HOUR_FACTOR
+
+    # Hourly condition matches the daily condition 80% of the time
+    hourly_codes = np.where(
+        rng.random(shape) < 0.8,
+        day_codes[:, None],
+        rng.integers(0, len(WEATHER_CONDITIONS), shape)
+    )
+
+    # Solar irradiance drawn from each hour's condition range, scaled by daylight
+    base_irradiance = rng.uniform(_IRRADIANCE_LOW[hourly_codes], _IRRADIANCE_HIGH[hourly_codes])
+    solar_irradiance = np.round(base_irradiance * _SOLAR_HOUR_FACTOR, 1)
+    generation_potential = solar_irradiance.sum(axis=1) / 1000  # kWh estimate
+
+    humidity = rng.integers(35, 86, shape)
+    wind_speed = np.round(rng.uniform(3, 20, shape), 1)
+
+    # Convert to Python scalars once so the tool output stays JSON serializable
+    rounded_temps = np.round(temps, 1).tolist()
+    hourly_codes = hourly_codes.tolist()
+    solar_irradiance = solar_irradiance.tolist()
+    humidity = humidity.tolist()
+    wind_speed = wind_speed.tolist()
+
+    forecast["hourly"] = [
+        {
+            "day": day,
+            "hour": hour,
+            "temperature_c": rounded_temps[day][hour],
+            "condition": WEATHER_CONDITIONS[hourly_codes[day][hour]],
+            "solar_irradiance": solar_irradiance[day][hour],
+            "humidity": humidity[day][hour],
+            "wind_speed": wind_speed[day][hour]
+        }
+        for day in range(days)
+        for hour in range(24)
+    ]
 
-        # Daily summary
-        forecast["daily"].append({
+    # Daily summary
+    high_temps = temps.max(axis=1).tolist()
+    low_temps = temps.min(axis=1).tolist()
+    today = datetime.now().date()
+    dates = [(today + timedelta(days=day)).isoformat() for day in range(days)]
+    forecast["daily"] = [
+        {
             "day": day,
-            "date": (datetime.now() + timedelta(days=day)).strftime("%Y-%m-%d"),
-            "condition": day_condition,
-            "high_temp_c": round(max(daily_temps), 1),
-            "low_temp_c": round(min(daily_temps), 1),
-            "solar_generation_potential_kwh": round(daily_generation_potential, 2)
-        })
+            "date": dates[day],
+            "condition": WEATHER_CONDITIONS[day_codes[day]],
+            "high_temp_c": round(high_temps[day], 1),
+            "low_temp_c": round(low_temps[day], 1),
+            "solar_generation_potential_kwh": round(float(generation_potential[day]), 2)
+        }
+        for day in range(days)
+    ]
 
     return forecast
 
@@ -171,13 +202,6 @@ def get_electricity_prices(date: str = None) -> Dict[str, Any]:
     if date is None:
         date = datetime.now().strftime("%Y-%m-%d")
     
-    # Base prices per kWh for different periods (typical California TOU rates)
-    pricing_tiers = {
-        "off_peak": {"rate": 0.10, "hours": list(range(0, 6)) + list(range(23, 24))},  # 11 PM - 6 AM
-        "partial_peak": {"rate": 0.15, "hours": list(range(6, 16)) + list(range(21, 23))},  # 6 AM - 4 PM, 9 PM - 11 PM
-        "peak": {"rate": 0.25, "hours": list(range(16, 21))}  # 4 PM - 9 PM
-    }
-
     prices = {
         "date": date,
         "pricing_type": "time_of_use",
@@ -194,38 +218,28 @@ def get_electricity_prices(date: str = None) -> Dict[str, Any]:
         }
     }
 
-    for hour in range(24):
-        # Determine which period this hour falls into
-        period = "partial_peak"  # Default
-        rate = 0.15
-        demand_charge = 0.0
+    # Add slight random variation to simulate real-world fluctuations
+    rng = np.random.default_rng()
+    final_rates = np.round(_TOU_RATE_BY_HOUR + rng.uniform(-0.01, 0.01, 24), 3)
+    total_rates = np.round(final_rates + _DEMAND_CHARGE_BY_HOUR, 3)
 
-        for tier_name, tier_info in pricing_tiers.items():
-            if hour in tier_info["hours"]:
-                period = tier_name
-                rate = tier_info["rate"]
-                break
-
-        # Add demand charge during peak hours
-        if period == "peak":
-            demand_charge = 0.05  # Additional demand charge during peak
-
-        # Add slight random variation to simulate real-world fluctuations
-        rate_variation = random.uniform(-0.01, 0.01)
-        final_rate = round(rate + rate_variation, 3)
-
-        prices["hourly_rates"].append({
+    prices["hourly_rates"] = [
+        {
             "hour": hour,
-            "rate": final_rate,
+            "rate": rate,
             "period": period,
             "demand_charge": demand_charge,
-            "total_rate": round(final_rate + demand_charge, 3)
-        })
+            "total_rate": total_rate
+        }
+        for hour, (rate, period, demand_charge, total_rate) in enumerate(zip(
+            final_rates.tolist(), _TOU_PERIOD_BY_HOUR, _DEMAND_CHARGE_BY_HOUR.tolist(), total_rates.tolist()
+        ))
+    ]
 
     return prices
 
 @tool
-def query_energy_usage(start_date: str, end_date: str, device_type: str = None) -> Dict[str, Any]:
+def query_energy_usage(start_date: str, end_date: str, device_type: str = None, limit: int = 1000) -> Dict[str, Any]:
     """
     Query energy usage data from the database for a specific date range.
     
@@ -233,6 +247,7 @@ def query_energy_usage(start_date: str, end_date: str, device_type: str = None)
         start_date (str): Start date in YYYY-MM-DD format
         end_date (str): End date in YYYY-MM-DD format
         device_type (str): Optional device type filter (e.g., "EV", "HVAC", "appliance")
+        limit (int): Maximum number of individual records to return (totals cover all records)
     
     Returns:
         Dict[str, Any]: Energy usage data with consumption details
@@ -241,18 +256,16 @@ def query_energy_usage(start_date: str, end_date: str, device_type: str = None)
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
         
-        records = db_manager.get_usage_by_date_range(start_dt, end_dt)
-        
-        if device_type:
-            records = [r for r in records if r.device_type == device_type]
+        total_records, total_consumption, total_cost = db_manager.get_usage_totals(start_dt, end_dt, device_type)
+        records = db_manager.get_usage_by_date_range(start_dt, end_dt, device_type, limit=limit)
         
         usage_data = {
             "start_date": start_date,
             "end_date": end_date,
             "device_type": device_type,
-            "total_records": len(records),
-            "total_consumption_kwh": round(sum(r.consumption_kwh for r in records), 2),
-            "total_cost_usd": round(sum(r.cost_usd or 0 for r in records), 2),
+            "total_records": total_records,
+            "total_consumption_kwh": round(total_consumption, 2),
+            "total_cost_usd": round(total_cost, 2),
             "records": []
         }
         
@@ -270,13 +283,14 @@ def query_energy_usage(start_date: str, end_date: str, device_type: str = None)
         return {"error": f"Failed to query energy usage: {str(e)}"}
 
 @tool
-def query_solar_generation(start_date: str, end_date: str) -> Dict[str, Any]:
+def query_solar_generation(start_date: str, end_date: str, limit: int = 1000) -> Dict[str, Any]:
     """
     Query solar generation data from the database for a specific date range.
     
     Args:
         start_date (str): Start date in YYYY-MM-DD format
         end_date (str): End date in YYYY-MM-DD format
+        limit (int): Maximum number of individual records to return (totals cover all records)
     
     Returns:
         Dict[str, Any]: Solar generation data with production details
@@ -285,14 +299,15 @@ def query_solar_generation(start_date: str, end_date: str) -> Dict[str, Any]:
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
         
-        records = db_manager.get_generation_by_date_range(start_dt, end_dt)
+        total_records, total_generation = db_manager.get_generation_totals(start_dt, end_dt)
+        records = db_manager.get_generation_by_date_range(start_dt, end_dt, limit=limit)
         
         generation_data = {
             "start_date": start_date,
             "end_date": end_date,
-            "total_records": len(records),
-            "total_generation_kwh": round(sum(r.generation_kwh for r in records), 2),
-            "average_daily_generation": round(sum(r.generation_kwh for r in records) / max(1, (end_dt - start_dt).days), 2),
+            "total_records": total_records,
+            "total_generation_kwh": round(total_generation, 2),
+            "average_daily_generation": round(total_generation / max(1, (end_dt - start_dt).days), 2),
             "records": []
         }
         
@@ -321,62 +336,62 @@ def get_recent_energy_summary(hours: int = 24) -> Dict[str, Any]:
         Dict[str, Any]: Summary of recent energy data
     """
     try:
-        usage_records = db_manager.get_recent_usage(hours)
-        generation_records = db_manager.get_recent_generation(hours)
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours)
+
+        # One GROUP BY row per device instead of every usage record
+        device_rows = db_manager.get_usage_by_device(start_time, end_time)
+        generation_count, total_generation = db_manager.get_generation_totals(start_time, end_time)
         
         summary = {
             "time_period_hours": hours,
             "usage": {
-                "total_consumption_kwh": round(sum(r.consumption_kwh for r in usage_records), 2),
-                "total_cost_usd": round(sum(r.cost_usd or 0 for r in usage_records), 2),
-                "device_breakdown": {}
+                "total_consumption_kwh": round(sum(row.consumption_kwh for row in device_rows), 2),
+                "total_cost_usd": round(sum(row.cost_usd for row in device_rows), 2),
+                "device_breakdown": {
+                    row.device_type or "unknown": {
+                        "consumption_kwh": round(row.consumption_kwh, 2),
+                        "cost_usd": round(row.cost_usd, 2),
+                        "records": row.records
+                    }
+                    for row in device_rows
+                }
             },
             "generation": {
-                "total_generation_kwh": round(sum(r.generation_kwh for r in generation_records), 2),
-                "average_weather": "sunny" if generation_records else "unknown"
+                "total_generation_kwh": round(total_generation, 2),
+                "average_weather": "sunny" if generation_count else "unknown"
             }
         }
         
-        # Calculate device breakdown
-        for record in usage_records:
-            device = record.device_type or "unknown"
-            if device not in summary["usage"]["device_breakdown"]:
-                summary["usage"]["device_breakdown"][device] = {
-                    "consumption_kwh": 0,
-                    "cost_usd": 0,
-                    "records": 0
-                }
-            summary["usage"]["device_breakdown"][device]["consumption_kwh"] += record.consumption_kwh
-            summary["usage"]["device_breakdown"][device]["cost_usd"] += record.cost_usd or 0
-            summary["usage"]["device_breakdown"][device]["records"] += 1
-        
-        # Round the breakdown values
-        for device_data in summary["usage"]["device_breakdown"].values():
-            device_data["consumption_kwh"] = round(device_data["consumption_kwh"], 2)
-            device_data["cost_usd"] = round(device_data["cost_usd"], 2)
-        
         return summary
     except Exception as e:
         return {"error": f"Failed to get recent energy summary: {str(e)}"}
 
-@tool
-def search_energy_tips(query: str, max_results: int = 5) -> Dict[str, Any]:
+# Vector store for search_energy_tips, created on first use and shared by later calls
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
+
+
+def get_vectorstore() -> Chroma:
     """
-    Search for energy-saving tips and best practices using RAG.
-    
-    Args:
-        query (str): Search query for energy tips
-        max_results (int): Maximum number of results to return
-    
-    Returns:
-        Dict[str, Any]: Relevant energy tips and best practices
+    Get the energy tips vector store, building it from the tip documents
+    the first time if it has not been persisted yet.
     """
-    try:
+    global _vectorstore
+    if _vectorstore is not None:
+        return _vectorstore
+
+    with _vectorstore_lock:
+        if _vectorstore is not None:
+            return _vectorstore
+
         # Initialize vector store if it doesn't exist
         persist_directory = "data/vectorstore"
         if not os.path.exists(persist_directory):
             os.makedirs(persist_directory)
-        
+
+        embeddings = OpenAIEmbeddings()
+
         # Load documents if vector store doesn't exist
         if not os.path.exists(os.path.join(persist_directory, "chroma.sqlite3")):
             # Load documents
@@ -386,13 +401,12 @@ def search_energy_tips(query: str, max_results: int = 5) -> Dict[str, Any]:
                     loader = TextLoader(doc_path)
                     docs = loader.load()
                     documents.extend(docs)
-            
+
             # Split documents
             text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
             splits = text_splitter.split_documents(documents)
-            
+
             # Create vector store
-            embeddings = OpenAIEmbeddings()
             vectorstore = Chroma.from_documents(
                 documents=splits,
                 embedding=embeddings,
@@ -400,14 +414,37 @@ def search_energy_tips(query: str, max_results: int = 5) -> Dict[str, Any]:
             )
         else:
             # Load existing vector store
-            embeddings = OpenAIEmbeddings()
             vectorstore = Chroma(
                 persist_directory=persist_directory,
                 embedding_function=embeddings
             )
+
+        _vectorstore = vectorstore
+        return _vectorstore
+
+
+@lru_cache(maxsize=512)
+def _embed_query(query: str) -> tuple:
+    """Embed a search query once; repeated queries skip the embeddings API call"""
+    return tuple(get_vectorstore().embeddings.embed_query(query))
+
+@tool
+def search_energy_tips(query: str, max_results: int = 5) -> Dict[str, Any]:
+    """
+    Search for energy-saving tips and best practices using RAG.
+    
+    Args:
+        query (str): Search query for energy tips
+        max_results (int): Maximum number of results to return
+    
+    Returns:
+        Dict[str, Any]: Relevant energy tips and best practices
+    """
+    try:
+        vectorstore = get_vectorstore()
         
         # Search for relevant documents
-        docs = vectorstore.similarity_search(query, k=max_results)
+        docs = vectorstore.similarity_search_by_vector(list(_embed_query(query)), k=max_results)
         
         results = {
             "query": query,
@@ -458,12 +495,93 @@ def calculate_energy_savings(device_type: str, current_usage_kwh: float,
     }
 
 
-TOOL_KIT = [
+@tool
+def calculate_energy_savings_batch(devices: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Calculate potential energy savings for several devices in one call.
+    Prefer this over repeated calculate_energy_savings calls when comparing devices.
+    
+    Args:
+        devices (List[Dict[str, Any]]): One entry per device with keys "device_type",
+            "current_usage_kwh", "optimized_usage_kwh" and optionally "price_per_kwh" (default 0.12)
+    
+    Returns:
+        Dict[str, Any]: Per-device savings (same fields as calculate_energy_savings) and totals
+    """
+    try:
+        current = np.array([float(device["current_usage_kwh"]) for device in devices])
+        optimized = np.array([float(device["optimized_usage_kwh"]) for device in devices])
+        prices = np.array([float(device.get("price_per_kwh", 0.12)) for device in devices])
+        
+        savings_kwh = current - optimized
+        savings_usd = savings_kwh * prices
+        savings_percentage = np.divide(
+            savings_kwh * 100, current, out=np.zeros_like(savings_kwh), where=current > 0
+        )
+        
+        per_device = [
+            {
+                "device_type": device.get("device_type"),
+                "current_usage_kwh": device["current_usage_kwh"],
+                "optimized_usage_kwh": device["optimized_usage_kwh"],
+                "savings_kwh": round(kwh, 2),
+                "savings_usd": round(usd, 2),
+                "savings_percentage": round(pct, 1),
+                "price_per_kwh": price,
+                "annual_savings_usd": round(usd * 365, 2)
+            }
+            for device, kwh, usd, pct, price in zip(
+                devices, savings_kwh.tolist(), savings_usd.tolist(), savings_percentage.tolist(), prices.tolist()
+            )
+        ]
+        
+        total_current = float(current.sum())
+        total_savings_kwh = float(savings_kwh.sum())
+        total_savings_usd = float(savings_usd.sum())
+        
+        return {
+            "devices": per_device,
+            "total_savings_kwh": round(total_savings_kwh, 2),
+            "total_savings_usd": round(total_savings_usd, 2),
+            "total_savings_percentage": round(total_savings_kwh / total_current * 100, 1) if total_current > 0 else 0,
+            "total_annual_savings_usd": round(total_savings_usd * 365, 2)
+        }
+    except Exception as e:
+        return {"error": f"Failed to calculate energy savings: {str(e)}"}
+
+
+TOOL_KIT = (
     get_weather_forecast,
     get_electricity_prices,
     query_energy_usage,
     query_solar_generation,
     get_recent_energy_summary,
     search_energy_tips,
-    calculate_energy_savings
-]
+    calculate_energy_savings,
+    calculate_energy_savings_batch
+)
+
+
+def _dumps_tool_result(result: Any) -> str:
+    """Serialize a tool result with orjson, the way it is handed to the LLM"""
+    return orjson.dumps(result, default=str, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def _with_json_output(energy_tool: StructuredTool) -> StructuredTool:
+    """
+    Copy of a tool that returns its result pre-serialized as JSON.
+
+    LangChain otherwise stringifies dict results with the stdlib json module,
+    which dominates the cost of large payloads such as the hourly forecast.
+    """
+    func = energy_tool.func
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        return _dumps_tool_result(func(*args, **kwargs))
+
+    return energy_tool.model_copy(update={"func": run})
+
+
+# Tools for the agent; TOOL_KIT keeps returning dicts for direct callers
+AGENT_TOOL_KIT = tuple(_with_json_output(energy_tool) for energy_tool in TOOL_KIT)
@@ -4,9 +4,11 @@ CultPass Support Agents
 from .support_agent import create_support_agent
 from .knowledge_agent import create_knowledge_agent
 from .account_agent import create_account_agent
+from .llm import get_llm
 
 __all__ = [
     "create_support_agent",
     "create_knowledge_agent",
     "create_account_agent",
+    "get_llm",
 ]
@@ -1,13 +1,15 @@
 """
 Account Agent - Handles user account inquiries and subscription management
 """
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+
 from langchain_core.messages import SystemMessage
 from langgraph.prebuilt import create_react_agent
 
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from agentic.agents.llm import get_llm
 from agentic.tools.user_tools import get_user_info, get_user_subscription, get_user_reservations
 from agentic.tools.experience_tools import get_available_experiences, get_experience_details
 
@@ -32,6 +34,7 @@ When checking accounts:
 1. First get user info by email
 2. Then check subscription if needed
 3. Look up reservations if the query is about bookings
+4. Once you have the user_id, request the subscription and reservation lookups together in a single step; they run in parallel
 
 For experience inquiries:
 - Show available experiences that match user's preferences
@@ -40,9 +43,13 @@ For experience inquiries:
 """
 
 
+@lru_cache(maxsize=4)
 def create_account_agent(model: str = "gpt-4o-mini"):
-    """Create an account management agent"""
-    llm = ChatOpenAI(model=model, temperature=0)
+    """Create an account management agent
+
+    The compiled graph is cached per model and shared between callers.
+    """
+    llm = get_llm(model)
 
     agent = create_react_agent(
         name="account_agent",
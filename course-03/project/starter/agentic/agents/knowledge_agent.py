@@ -1,13 +1,15 @@
 """
 Knowledge Agent - Handles knowledge base searches and FAQ responses
 """
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+
 from langchain_core.messages import SystemMessage
 from langgraph.prebuilt import create_react_agent
 
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from agentic.agents.llm import get_llm
 from agentic.tools.knowledge_tools import search_knowledge_base, get_article_by_id
 
 
@@ -29,9 +31,13 @@ Remember: You're helping users understand how CultPass works, not handling their
 """
 
 
+@lru_cache(maxsize=4)
 def create_knowledge_agent(model: str = "gpt-4o-mini"):
-    """Create a knowledge base agent"""
-    llm = ChatOpenAI(model=model, temperature=0)
+    """Create a knowledge base agent
+
+    The compiled graph is cached per model and shared between callers.
+    """
+    llm = get_llm(model)
 
     agent = create_react_agent(
         name="knowledge_agent",
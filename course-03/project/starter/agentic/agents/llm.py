@@ -0,0 +1,25 @@
+"""
+Shared chat model for the CultPass agents
+"""
+from functools import lru_cache
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+
+# One HTTP/2 connection pool for every chat model, so LLM calls reuse open
+# TLS connections and multiplex concurrent requests over them
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+http_client = httpx.Client(http2=True, limits=HTTP_LIMITS)
+http_async_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
+
+
+@lru_cache(maxsize=4)
+def get_llm(model: str = "gpt-4o-mini") -> ChatOpenAI:
+    """Get the chat model for a model name, created once and shared by all agents"""
+    return ChatOpenAI(
+        model=model,
+        temperature=0,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
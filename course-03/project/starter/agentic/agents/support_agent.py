@@ -1,13 +1,15 @@
 """
 Main Support Agent - Primary customer-facing agent that orchestrates other agents
 """
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+
 from langchain_core.messages import SystemMessage
 from langgraph.prebuilt import create_react_agent
 
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../..'))
+from agentic.agents.llm import get_llm
 from agentic.tools.knowledge_tools import search_knowledge_base
 from agentic.tools.user_tools import get_user_info, get_user_subscription, get_user_reservations
 from agentic.tools.experience_tools import get_available_experiences, get_experience_details
@@ -55,9 +57,13 @@ Remember: Always be helpful and look for ways to resolve the user's issue!
 """
 
 
+@lru_cache(maxsize=4)
 def create_support_agent(model: str = "gpt-4o-mini"):
-    """Create the main support agent with all tools"""
-    llm = ChatOpenAI(model=model, temperature=0)
+    """Create the main support agent with all tools
+
+    The compiled graph is cached per model and shared between callers.
+    """
+    llm = get_llm(model)
 
     all_tools = [
         # Knowledge tools
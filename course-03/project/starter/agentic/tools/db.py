@@ -0,0 +1,29 @@
+"""
+Database engines shared by the CultPass support tools
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+
+# Database connections
+CULTPASS_DB = "data/external/cultpass.db"
+UDAHUB_DB = "data/core/udahub.db"
+
+
+# One engine and connection pool per database, created once per process
+cultpass_engine = create_engine(f"sqlite:///{CULTPASS_DB}", echo=False)
+CultpassSession = sessionmaker(bind=cultpass_engine, expire_on_commit=False)
+
+udahub_engine = create_engine(f"sqlite:///{UDAHUB_DB}", echo=False)
+UdahubSession = sessionmaker(bind=udahub_engine, expire_on_commit=False)
+
+
+@event.listens_for(udahub_engine, "connect")
+def _set_udahub_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets ticket writes proceed without blocking concurrent knowledge and ticket reads
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # Enforced so a message for an unknown ticket fails on insert
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
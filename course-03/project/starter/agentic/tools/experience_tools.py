@@ -3,25 +3,19 @@ Experience-related Tools for CultPass Support
 """
 from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select
 from datetime import datetime
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from data.models import cultpass
-
-
-# Database connection
-CULTPASS_DB = "data/external/cultpass.db"
+from agentic.tools.db import CultpassSession
 
 
 def get_db_session():
     """Get a database session for cultpass"""
-    engine = create_engine(f"sqlite:///{CULTPASS_DB}", echo=False)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return CultpassSession()
 
 
 @tool
@@ -42,36 +36,37 @@ def get_available_experiences(
     """
     session = get_db_session()
     try:
-        query = session.query(cultpass.Experience)
+        Experience = cultpass.Experience
+
+        # Select only the returned columns; rows come back as plain mappings
+        # instead of hydrated ORM objects
+        stmt = select(
+            Experience.experience_id,
+            Experience.title,
+            Experience.description,
+            Experience.location,
+            Experience.when,
+            Experience.slots_available,
+            Experience.is_premium
+        )
 
         # Filter by future events only
-        query = query.filter(cultpass.Experience.when >= datetime.now())
+        stmt = stmt.where(Experience.when >= datetime.now())
 
         # Apply optional filters
         if location:
-            query = query.filter(
-                cultpass.Experience.location.ilike(f"%{location}%")
-            )
+            stmt = stmt.where(Experience.location.ilike(f"%{location}%"))
 
         if is_premium is not None:
-            query = query.filter(cultpass.Experience.is_premium == is_premium)
+            stmt = stmt.where(Experience.is_premium == is_premium)
 
         # Only show experiences with available slots
-        query = query.filter(cultpass.Experience.slots_available > 0)
-
-        experiences = query.order_by(cultpass.Experience.when).all()
-
-        results = []
-        for exp in experiences:
-            results.append({
-                "experience_id": exp.experience_id,
-                "title": exp.title,
-                "description": exp.description,
-                "location": exp.location,
-                "when": exp.when.isoformat() if exp.when else None,
-                "slots_available": exp.slots_available,
-                "is_premium": exp.is_premium
-            })
+        stmt = stmt.where(Experience.slots_available > 0)
+
+        # Column names become the dict keys; only "when" needs converting
+        results = [dict(row) for row in session.execute(stmt.order_by(Experience.when)).mappings()]
+        for result in results:
+            result["when"] = result["when"].isoformat() if result["when"] else None
 
         return results if results else [{"message": "No experiences found matching your criteria"}]
 
@@ -92,8 +87,18 @@ def get_experience_details(experience_id: str) -> Dict[str, Any]:
     """
     session = get_db_session()
     try:
-        experience = session.query(cultpass.Experience).filter(
-            cultpass.Experience.experience_id == experience_id
+        Experience = cultpass.Experience
+
+        experience = session.execute(
+            select(
+                Experience.experience_id,
+                Experience.title,
+                Experience.description,
+                Experience.location,
+                Experience.when,
+                Experience.slots_available,
+                Experience.is_premium
+            ).where(Experience.experience_id == experience_id)
         ).first()
 
         if experience:
@@ -1,27 +1,208 @@
 """
 Knowledge Base Tools for CultPass Support
 """
-from typing import List, Dict, Any
+from collections import Counter
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from langchain_core.tools import tool
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, text
+import ahocorasick
 import sys
 import os
+import threading
 
 # Add parent paths
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from data.models import udahub
-
-
-# Database connection
-UDAHUB_DB = "data/core/udahub.db"
+from agentic.tools.db import UdahubSession
 
 
 def get_db_session():
     """Get a database session for udahub"""
-    engine = create_engine(f"sqlite:///{UDAHUB_DB}", echo=False)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return UdahubSession()
+
+
+# Column weights mirror the previous keyword scoring: title 3, content 1, tags 2
+# (article_id is stored unindexed and never matches)
+SEARCH_KNOWLEDGE_SQL = text("""
+    SELECT k.article_id, k.title, k.content, k.tags,
+           -bm25(knowledge_fts, 0.0, 3.0, 1.0, 2.0) AS relevance_score
+    FROM knowledge_fts
+    JOIN knowledge AS k ON k.article_id = knowledge_fts.article_id
+    WHERE knowledge_fts MATCH :match AND k.account_id = :account_id
+    ORDER BY relevance_score DESC
+    LIMIT 5
+""")
+
+GET_ARTICLE_SQL = text("""
+    SELECT article_id, title, content, tags
+    FROM knowledge
+    WHERE article_id = :article_id
+""")
+
+# None until checked; False when the database has no knowledge_fts table
+_knowledge_fts_available: Optional[bool] = None
+_knowledge_fts_lock = threading.Lock()
+
+
+def has_knowledge_fts(session) -> bool:
+    """
+    Check (once) whether the knowledge full-text index exists. It is created
+    with the udahub schema; databases set up without it, or on a SQLite build
+    without FTS5, are searched by keyword scoring in Python instead.
+    """
+    global _knowledge_fts_available
+    with _knowledge_fts_lock:
+        if _knowledge_fts_available is None:
+            _knowledge_fts_available = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'")
+            ).first() is not None
+        return _knowledge_fts_available
+
+
+# Article columns per account for the keyword fallback, stored as parallel lists
+# with the lowercased text computed once instead of on every search
+_keyword_index: Dict[str, Dict[str, List[str]]] = {}
+
+
+def get_keyword_index(session, account_id: str) -> Dict[str, List[str]]:
+    """Load (once per account) the article columns used by keyword scoring"""
+    index = _keyword_index.get(account_id)
+    if index is None:
+        Knowledge = udahub.Knowledge
+        rows = session.execute(
+            select(Knowledge.article_id, Knowledge.title, Knowledge.content, Knowledge.tags)
+            .where(Knowledge.account_id == account_id)
+        ).all()
+
+        index = {
+            "ids": [row.article_id for row in rows],
+            "titles": [row.title for row in rows],
+            "contents": [row.content for row in rows],
+            "tags": [row.tags for row in rows],
+        }
+        for field in ("titles", "contents", "tags"):
+            index[field + "_lc"] = [value.lower() if value else "" for value in index[field]]
+        _keyword_index[account_id] = index
+
+    return index
+
+
+# Weights of a query term found in each article field
+KEYWORD_FIELD_WEIGHTS = (("titles_lc", 3), ("contents_lc", 1), ("tags_lc", 2))
+
+
+def score_articles_by_keywords(index: Dict[str, List[str]], terms: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    Score articles by which query terms occur in their title, content and tags.
+
+    All terms are matched in a single Aho-Corasick pass per field instead of one
+    substring scan per term. A term repeated in the query counts once per repeat.
+    """
+    automaton = ahocorasick.Automaton()
+    for term, count in Counter(terms).items():
+        automaton.add_word(term, (term, count))
+    automaton.make_automaton()
+
+    scores = [0] * len(index["ids"])
+    for field, weight in KEYWORD_FIELD_WEIGHTS:
+        for position, value in enumerate(index[field]):
+            if value:
+                matched = {match for _, match in automaton.iter(value)}
+                scores[position] += weight * sum(count for _, count in matched)
+
+    results = [
+        {
+            "article_id": index["ids"][position],
+            "title": index["titles"][position],
+            "content": index["contents"][position],
+            "tags": index["tags"][position],
+            "relevance_score": score
+        }
+        for position, score in enumerate(scores)
+        if score > 0
+    ]
+
+    # Sort by relevance score
+    results.sort(key=lambda x: x["relevance_score"], reverse=True)
+    return results[:5]  # Return top 5 results
+
+
+# Single-term queries up to this length are matched as word prefixes
+SHORT_QUERY_MAX_LENGTH = 3
+
+# Queries made only of these words match nearly every article, so they are not searched
+QUERY_STOPWORDS = frozenset({
+    "a", "an", "and", "i", "in", "is", "it", "of", "on", "or", "the", "to",
+})
+
+
+@lru_cache(maxsize=512)
+def _search_knowledge(terms: Tuple[str, ...], account_id: str) -> Tuple[Dict[str, Any], ...]:
+    """Run a knowledge search for normalized query terms; results are cached per (terms, account)"""
+    session = get_db_session()
+    try:
+        if not has_knowledge_fts(session):
+            return tuple(score_articles_by_keywords(get_keyword_index(session, account_id), terms))
+
+        # Match articles containing any of the query terms, ranked by bm25 in SQLite
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        if len(terms) == 1 and len(terms[0]) <= SHORT_QUERY_MAX_LENGTH:
+            # A lone short token is usually a partial word ("sub", "qr"): match it as a
+            # prefix, which the FTS prefix index answers without scanning the vocabulary
+            match += " *"
+        rows = session.execute(
+            SEARCH_KNOWLEDGE_SQL, {"match": match, "account_id": account_id}
+        ).mappings()
+
+        return tuple(
+            {**row, "relevance_score": round(row["relevance_score"], 3)}
+            for row in rows
+        )
+
+    finally:
+        session.close()
+
+
+@lru_cache(maxsize=512)
+def _get_article(article_id: str) -> Dict[str, Any]:
+    """
+    Look up a knowledge article; found articles are cached per article ID.
+    Raises KeyError when there is no match, so misses are never cached.
+    """
+    session = get_db_session()
+    try:
+        Knowledge = udahub.Knowledge
+
+        article = session.execute(GET_ARTICLE_SQL, {"article_id": article_id}).first()
+        if article:
+            return dict(article._mapping)
+
+        if article_id:
+            # Complete a truncated ID when exactly one article starts with it; the
+            # range condition is answered by the primary key index
+            candidates = session.execute(
+                select(Knowledge.article_id, Knowledge.title, Knowledge.content, Knowledge.tags)
+                .where(Knowledge.article_id >= article_id, Knowledge.article_id < article_id + "\U0010ffff")
+                .limit(2)
+            ).all()
+            if len(candidates) == 1:
+                # Flag the substitution so the caller knows the ID was completed
+                return {**candidates[0]._mapping, "matched_prefix": article_id}
+
+        raise KeyError(article_id)
+
+    finally:
+        session.close()
+
+
+def clear_knowledge_cache() -> None:
+    """Forget cached articles and search results, e.g. after the knowledge table is reloaded"""
+    global _knowledge_fts_available
+    _search_knowledge.cache_clear()
+    _get_article.cache_clear()
+    _keyword_index.clear()
+    _knowledge_fts_available = None
 
 
 @tool
@@ -37,46 +218,13 @@ def search_knowledge_base(query: str, account_id: str = "cultpass") -> List[Dict
     Returns:
         List of matching knowledge articles with title, content, and tags
     """
-    session = get_db_session()
-    try:
-        # Search for articles that match the query in title, content, or tags
-        query_lower = query.lower()
-        articles = session.query(udahub.Knowledge).filter(
-            udahub.Knowledge.account_id == account_id
-        ).all()
+    terms = tuple(query.lower().split())
+    if QUERY_STOPWORDS.issuperset(terms):
+        # Empty, whitespace-only or stopword-only queries cannot rank any article
+        return []
 
-        results = []
-        for article in articles:
-            # Simple relevance scoring based on keyword matching
-            score = 0
-            title_lower = article.title.lower() if article.title else ""
-            content_lower = article.content.lower() if article.content else ""
-            tags_lower = article.tags.lower() if article.tags else ""
-
-            # Check for query terms in title, content, and tags
-            for term in query_lower.split():
-                if term in title_lower:
-                    score += 3
-                if term in content_lower:
-                    score += 1
-                if term in tags_lower:
-                    score += 2
-
-            if score > 0:
-                results.append({
-                    "article_id": article.article_id,
-                    "title": article.title,
-                    "content": article.content,
-                    "tags": article.tags,
-                    "relevance_score": score
-                })
-
-        # Sort by relevance score
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return results[:5]  # Return top 5 results
-
-    finally:
-        session.close()
+    # Copy the cached dicts so callers cannot modify the cache
+    return [dict(article) for article in _search_knowledge(terms, account_id)]
 
 
 @tool
@@ -88,23 +236,11 @@ def get_article_by_id(article_id: str) -> Dict[str, Any]:
         article_id: The unique identifier of the article
 
     Returns:
-        The knowledge article details or an error message
+        The knowledge article details or an error message. An incomplete ID
+        that starts exactly one article's ID returns that article, with
+        matched_prefix set to the ID that was given
     """
-    session = get_db_session()
     try:
-        article = session.query(udahub.Knowledge).filter(
-            udahub.Knowledge.article_id == article_id
-        ).first()
-
-        if article:
-            return {
-                "article_id": article.article_id,
-                "title": article.title,
-                "content": article.content,
-                "tags": article.tags
-            }
-        else:
-            return {"error": f"Article with ID {article_id} not found"}
-
-    finally:
-        session.close()
+        return dict(_get_article(article_id))
+    except KeyError:
+        return {"error": f"Article with ID {article_id} not found"}
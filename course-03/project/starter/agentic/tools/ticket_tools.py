@@ -3,25 +3,34 @@ Ticket Management Tools for CultPass Support
 """
 from typing import Dict, Any, Optional
 from langchain_core.tools import tool
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 import uuid
+import time
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from data.models import udahub
-
-
-# Database connection
-UDAHUB_DB = "data/core/udahub.db"
+from agentic.tools.db import UdahubSession
 
 
 def get_db_session():
     """Get a database session for udahub"""
-    engine = create_engine(f"sqlite:///{UDAHUB_DB}", echo=False)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return UdahubSession()
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7): a millisecond timestamp followed by
+    random bits, so new message IDs append to the primary key index instead of
+    landing at random positions like uuid4.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return uuid.UUID(int=value)
 
 
 @tool
@@ -38,27 +47,31 @@ def get_ticket_info(ticket_id: str) -> Dict[str, Any]:
     """
     session = get_db_session()
     try:
-        ticket = session.query(udahub.Ticket).filter(
-            udahub.Ticket.ticket_id == ticket_id
-        ).first()
+        # Load the ticket with its metadata and user in one query
+        ticket = session.get(
+            udahub.Ticket,
+            ticket_id,
+            options=[
+                joinedload(udahub.Ticket.ticket_metadata),
+                joinedload(udahub.Ticket.user)
+            ]
+        )
 
         if not ticket:
             return {"error": f"Ticket with ID {ticket_id} not found"}
 
-        # Get ticket metadata
-        metadata = session.query(udahub.TicketMetadata).filter(
-            udahub.TicketMetadata.ticket_id == ticket_id
-        ).first()
-
-        # Get message history
-        messages = session.query(udahub.TicketMessage).filter(
-            udahub.TicketMessage.ticket_id == ticket_id
-        ).order_by(udahub.TicketMessage.created_at).all()
-
-        # Get user info
-        user = session.query(udahub.User).filter(
-            udahub.User.user_id == ticket.user_id
-        ).first()
+        metadata = ticket.ticket_metadata
+        user = ticket.user
+
+        # Stream the message history as plain column rows, already ordered by the
+        # (ticket_id, created_at) index, straight into the response
+        TicketMessage = udahub.TicketMessage
+        message_rows = session.execute(
+            select(TicketMessage.role, TicketMessage.content, TicketMessage.created_at)
+            .where(TicketMessage.ticket_id == ticket_id)
+            .order_by(TicketMessage.created_at)
+            .execution_options(yield_per=200)
+        )
 
         return {
             "ticket_id": ticket.ticket_id,
@@ -80,7 +93,7 @@ def get_ticket_info(ticket_id: str) -> Dict[str, Any]:
                     "content": msg.content,
                     "created_at": msg.created_at.isoformat() if msg.created_at else None
                 }
-                for msg in messages
+                for msg in message_rows
             ]
         }
 
@@ -108,25 +121,30 @@ def update_ticket_status(
     """
     session = get_db_session()
     try:
-        metadata = session.query(udahub.TicketMetadata).filter(
-            udahub.TicketMetadata.ticket_id == ticket_id
+        TicketMetadata = udahub.TicketMetadata
+
+        values = {"status": status}
+        if issue_type:
+            values["main_issue_type"] = issue_type
+
+        # Update and read back in one statement; no row means the ticket does not exist
+        metadata = session.execute(
+            update(TicketMetadata)
+            .where(TicketMetadata.ticket_id == ticket_id)
+            .values(**values)
+            .returning(TicketMetadata.main_issue_type)
         ).first()
 
         if not metadata:
             return {"error": f"Ticket metadata for {ticket_id} not found"}
 
-        # Update status
-        metadata.status = status
-        if issue_type:
-            metadata.main_issue_type = issue_type
-
         session.commit()
 
         return {
             "success": True,
             "ticket_id": ticket_id,
             "new_status": status,
-            "issue_type": issue_type or metadata.main_issue_type
+            "issue_type": metadata.main_issue_type
         }
 
     except Exception as e:
@@ -156,31 +174,28 @@ def add_ticket_message(
     """
     session = get_db_session()
     try:
-        # Verify ticket exists
-        ticket = session.query(udahub.Ticket).filter(
-            udahub.Ticket.ticket_id == ticket_id
-        ).first()
-
-        if not ticket:
-            return {"error": f"Ticket with ID {ticket_id} not found"}
-
-        # Create message
-        message = udahub.TicketMessage(
-            message_id=str(uuid.uuid4()),
-            ticket_id=ticket_id,
-            role=role,
-            content=content
+        message_id = str(uuid7())
+
+        # The ticket_id foreign key rejects messages for tickets that do not exist
+        session.execute(
+            insert(udahub.TicketMessage).values(
+                message_id=message_id,
+                ticket_id=ticket_id,
+                role=role,
+                content=content
+            )
         )
-
-        session.add(message)
         session.commit()
 
         return {
             "success": True,
-            "message_id": message.message_id,
+            "message_id": message_id,
             "ticket_id": ticket_id
         }
 
+    except IntegrityError:
+        session.rollback()
+        return {"error": f"Ticket with ID {ticket_id} not found"}
     except Exception as e:
         session.rollback()
         return {"error": f"Failed to add message: {str(e)}"}
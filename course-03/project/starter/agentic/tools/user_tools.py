@@ -3,24 +3,33 @@ User-related Tools for CultPass Support
 """
 from typing import Dict, Any, List
 from langchain_core.tools import tool
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, text
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 from data.models import cultpass
-
-
-# Database connection
-CULTPASS_DB = "data/external/cultpass.db"
+from agentic.tools.db import CultpassSession
 
 
 def get_db_session():
     """Get a database session for cultpass"""
-    engine = create_engine(f"sqlite:///{CULTPASS_DB}", echo=False)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return CultpassSession()
+
+
+# Hot point lookup kept as literal SQL so each call only binds and executes;
+# the typed columns still convert created_at to a datetime
+GET_USER_BY_EMAIL_SQL = text("""
+    SELECT user_id, full_name, email, is_blocked, created_at
+    FROM users
+    WHERE email = :email
+""").columns(
+    cultpass.User.user_id,
+    cultpass.User.full_name,
+    cultpass.User.email,
+    cultpass.User.is_blocked,
+    cultpass.User.created_at,
+)
 
 
 @tool
@@ -37,9 +46,8 @@ def get_user_info(user_email: str) -> Dict[str, Any]:
     """
     session = get_db_session()
     try:
-        user = session.query(cultpass.User).filter(
-            cultpass.User.email == user_email
-        ).first()
+        # Plain column rows; no ORM instance is needed to build the response
+        user = session.execute(GET_USER_BY_EMAIL_SQL, {"email": user_email}).first()
 
         if user:
             return {
@@ -70,8 +78,18 @@ def get_user_subscription(user_id: str) -> Dict[str, Any]:
     """
     session = get_db_session()
     try:
-        subscription = session.query(cultpass.Subscription).filter(
-            cultpass.Subscription.user_id == user_id
+        Subscription = cultpass.Subscription
+
+        subscription = session.execute(
+            select(
+                Subscription.subscription_id,
+                Subscription.user_id,
+                Subscription.status,
+                Subscription.tier,
+                Subscription.monthly_quota,
+                Subscription.started_at,
+                Subscription.ended_at
+            ).where(Subscription.user_id == user_id)
         ).first()
 
         if subscription:
@@ -105,24 +123,36 @@ def get_user_reservations(user_id: str) -> List[Dict[str, Any]]:
     """
     session = get_db_session()
     try:
-        reservations = session.query(cultpass.Reservation).filter(
-            cultpass.Reservation.user_id == user_id
-        ).all()
+        Reservation = cultpass.Reservation
+        Experience = cultpass.Experience
+
+        # One query for all reservations and their experiences instead of one lookup per reservation
+        rows = session.execute(
+            select(
+                Reservation.reservation_id,
+                Reservation.experience_id,
+                Reservation.status,
+                Reservation.created_at,
+                Experience.title,
+                Experience.location,
+                Experience.when
+            ).outerjoin(
+                Experience, Experience.experience_id == Reservation.experience_id
+            ).where(Reservation.user_id == user_id)
+        )
 
         results = []
-        for res in reservations:
-            experience = session.query(cultpass.Experience).filter(
-                cultpass.Experience.experience_id == res.experience_id
-            ).first()
-
+        for row in rows:
+            # Outer join: experience columns are NULL when the experience no longer exists
+            found = row.title is not None
             results.append({
-                "reservation_id": res.reservation_id,
-                "experience_id": res.experience_id,
-                "experience_title": experience.title if experience else "Unknown",
-                "experience_location": experience.location if experience else "Unknown",
-                "experience_when": experience.when.isoformat() if experience and experience.when else None,
-                "status": res.status,
-                "created_at": res.created_at.isoformat() if res.created_at else None
+                "reservation_id": row.reservation_id,
+                "experience_id": row.experience_id,
+                "experience_title": row.title if found else "Unknown",
+                "experience_location": row.location if found else "Unknown",
+                "experience_when": row.when.isoformat() if found and row.when else None,
+                "status": row.status,
+                "created_at": row.created_at.isoformat() if row.created_at else None
             })
 
         return results if results else [{"message": "No reservations found for this user"}]
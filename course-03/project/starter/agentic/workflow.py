@@ -4,11 +4,16 @@ CultPass Customer Support Orchestrator
 This workflow orchestrates the customer support experience by routing
 user queries to the appropriate agents and tools.
 """
-from langchain_openai import ChatOpenAI
+import os
+import sqlite3
+from functools import lru_cache
+
 from langchain_core.messages import SystemMessage
 from langgraph.prebuilt import create_react_agent
 from langgraph.checkpoint.memory import MemorySaver
 
+from agentic.agents.llm import get_llm
+
 # Import tools
 from agentic.tools.knowledge_tools import search_knowledge_base, get_article_by_id
 from agentic.tools.user_tools import get_user_info, get_user_subscription, get_user_reservations
@@ -42,6 +47,7 @@ You have access to several tools to help customers:
 - Ask for the customer's email to look up their account
 - Check their subscription status and tier
 - Review their reservations if relevant
+- Once you have the user_id, call `get_user_subscription` and `get_user_reservations` in the same step; independent tool calls run in parallel
 - Note if their account is blocked and explain next steps
 
 ### For Experience Inquiries
@@ -73,8 +79,10 @@ Offer to connect with human support when:
 Remember: Your goal is to help CultPass members get the most out of their cultural experiences!
 """
 
+ORCHESTRATOR_SYSTEM_MESSAGE = SystemMessage(content=ORCHESTRATOR_PROMPT)
+
 # All available tools for the orchestrator
-ALL_TOOLS = [
+ALL_TOOLS = (
     # Knowledge tools
     search_knowledge_base,
     get_article_by_id,
@@ -89,13 +97,38 @@ ALL_TOOLS = [
     get_ticket_info,
     update_ticket_status,
     add_ticket_message,
-]
+)
+
+
+def create_checkpointer():
+    """
+    Create the conversation checkpointer for the orchestrator.
+
+    Set CHECKPOINT_DB to a SQLite file path to keep conversations on disk, so
+    they survive restarts and do not grow process memory; otherwise they are
+    kept in memory.
+    """
+    checkpoint_db = os.getenv("CHECKPOINT_DB")
+    if not checkpoint_db:
+        return MemorySaver()
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    # SqliteSaver switches the database to WAL when it sets up its tables
+    return SqliteSaver(sqlite3.connect(checkpoint_db, check_same_thread=False))
+
+
+@lru_cache(maxsize=4)
+def create_orchestrator(model: str = "gpt-4o-mini"):
+    """Create the main orchestrator agent; the compiled graph is cached per model"""
+    return create_react_agent(
+        name="cultpass_support",
+        model=get_llm(model),
+        checkpointer=create_checkpointer(),
+        tools=ALL_TOOLS,
+        prompt=ORCHESTRATOR_SYSTEM_MESSAGE,
+    )
+
 
 # Create the main orchestrator agent
-orchestrator = create_react_agent(
-    name="cultpass_support",
-    model=ChatOpenAI(model="gpt-4o-mini", temperature=0),
-    checkpointer=MemorySaver(),
-    tools=ALL_TOOLS,
-    prompt=SystemMessage(content=ORCHESTRATOR_PROMPT),
-)
\ No newline at end of file
+orchestrator = create_orchestrator()
\ No newline at end of file
@@ -6,6 +6,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship
@@ -67,6 +68,15 @@ class Experience(Base):
 
     reservations = relationship("Reservation", back_populates="experience")
 
+    __table_args__ = (
+        # Serves the upcoming/bookable experience listing (when >= now, slots_available > 0)
+        Index(
+            "ix_experiences_when_slots",
+            "when", "slots_available", "is_premium",
+            sqlite_where=slots_available > 0,
+        ),
+    )
+
     def __repr__(self):
         return f"<Experience(experience_id='{self.experience_id}', title='{self.title}', when='{self.when}')>"
 
@@ -84,6 +94,10 @@ class Reservation(Base):
     user = relationship("User", back_populates="reservations")
     experience = relationship("Experience", back_populates="reservations")
 
+    __table_args__ = (
+        Index("ix_reservations_user_id", "user_id"),
+    )
+
     def __repr__(self):
         return f"<Reservation(reservation_id='{self.reservation_id}', user_id='{self.user_id}', experience_id='{self.experience_id}', status='{self.status}')>"
 
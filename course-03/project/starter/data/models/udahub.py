@@ -6,8 +6,11 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
-    UniqueConstraint
+    Index,
+    UniqueConstraint,
+    event
 )
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm.decl_api import DeclarativeBase
@@ -64,7 +67,7 @@ class Ticket(Base):
     account = relationship("Account", back_populates="tickets")
     user = relationship("User", back_populates="tickets")
     ticket_metadata = relationship("TicketMetadata", uselist=False, back_populates="ticket")
-    messages = relationship("TicketMessage", back_populates="ticket")
+    messages = relationship("TicketMessage", back_populates="ticket", order_by="TicketMessage.created_at")
 
     def __repr__(self):
         return f"<Ticket(ticket_id='{self.ticket_id}', channel='{self.channel}', created_at='{self.created_at}')>"
@@ -102,6 +105,11 @@ class TicketMessage(Base):
 
     ticket = relationship("Ticket", back_populates="messages")
 
+    __table_args__ = (
+        # Covers loading a ticket's messages in created_at order
+        Index('ix_ticket_messages_ticket_created', 'ticket_id', 'created_at'),
+    )
+
     def __repr__(self):
         short_content = (self.content[:30] + "...") if self.content and len(self.content) > 30 else self.content
         return f"<TicketMessage(message_id='{self.message_id}', role='{self.role.name}', content='{short_content}')>"
@@ -119,5 +127,64 @@ class Knowledge(Base):
 
     account = relationship("Account", back_populates="knowledge_articles")
 
+    __table_args__ = (
+        Index('ix_knowledge_account_id', 'account_id'),
+    )
+
     def __repr__(self):
         return f"<Knowledge(article_id='{self.article_id}', title='{self.title}')>"
+
+
+# Full-text index over knowledge articles, kept in sync with the knowledge table
+# by triggers. Rows are matched on article_id, not on the implicit rowid, which
+# SQLite may renumber on VACUUM for a table with a TEXT primary key.
+KNOWLEDGE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE knowledge_fts USING fts5(
+        article_id UNINDEXED, title, content, tags, tokenize='porter unicode61', prefix='2 3'
+    )""",
+    """CREATE TRIGGER knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+        INSERT INTO knowledge_fts(article_id, title, content, tags)
+        VALUES (new.article_id, new.title, new.content, new.tags);
+    END""",
+    """CREATE TRIGGER knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+        DELETE FROM knowledge_fts WHERE article_id = old.article_id;
+    END""",
+    """CREATE TRIGGER knowledge_fts_update AFTER UPDATE ON knowledge BEGIN
+        DELETE FROM knowledge_fts WHERE article_id = old.article_id;
+        INSERT INTO knowledge_fts(article_id, title, content, tags)
+        VALUES (new.article_id, new.title, new.content, new.tags);
+    END""",
+)
+
+
+def create_knowledge_fts(connection) -> bool:
+    """
+    Create the knowledge full-text index and fill it from existing articles.
+    Runs with create_all; call it directly to add the index to an older database.
+    Returns False if SQLite was built without FTS5, in which case knowledge
+    searches fall back to keyword scoring.
+    """
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'"
+    ).first()
+    if exists:
+        return True
+
+    try:
+        for statement in KNOWLEDGE_FTS_DDL:
+            connection.exec_driver_sql(statement)
+    except OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return False
+
+    connection.exec_driver_sql(
+        "INSERT INTO knowledge_fts(article_id, title, content, tags) "
+        "SELECT article_id, title, content, tags FROM knowledge"
+    )
+    return True
+
+
+@event.listens_for(Knowledge.__table__, "after_create")
+def _create_knowledge_fts_after_create(target, connection, **kw):
+    create_knowledge_fts(connection)